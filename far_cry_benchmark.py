@@ -0,0 +1,521 @@
+#!/usr/bin/env python3
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+import far_cry
+import far_cry_generator
+
+
+def parse_arguments():
+    '''
+    Description: Parse argument from user's input.
+    Input: none
+    Output:
+        args: directory of the log files, number of repetitions, database,
+              number of processes, sizes of the synthetic log files and
+              benchmark to run
+    '''
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-d', '--logs', default='logs',
+                        help='directory of the log files to benchmark on')
+    parser.add_argument('-r', '--repeat', type=int, default=20,
+                        help='number of passes over the log files')
+    parser.add_argument('--database', default='far_cry.db',
+                        help='database whose schema is used by the SQLite '
+                             'benchmark')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of processes of the chunked parser')
+    parser.add_argument('-s', '--sizes', nargs='+', default=['1M', '10M'],
+                        help='sizes of the synthetic log files of the stage '
+                             'benchmark, up to 1G')
+    parser.add_argument('-w', '--work-directory', default=None,
+                        help='directory keeping the synthetic log files from '
+                             'one run to the next, a temporary one if none')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='trace the peak memory of each stage, which '
+                             'slows the stages down several times')
+    parser.add_argument('-o', '--results', default=None,
+                        help='JSON lines file the stage timings are appended '
+                             'to')
+    parser.add_argument('--baseline', default=None,
+                        help='JSON lines file of earlier stage timings to '
+                             'compare to')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='slowdown from the baseline reported as a '
+                             'regression')
+    parser.add_argument('-b', '--benchmark', default='all',
+                        choices=['all', 'tokenizer', 'sqlite', 'chunks',
+                                 'stages'],
+                        help='benchmark to run')
+    args = parser.parse_args()
+    return args
+
+
+def read_corpus_lines(log_directory):
+    '''
+    Description: read every line of every log file of a directory
+    Input:
+        log_directory: directory of the log files
+    Output:
+        @return: a list of the lines of the log files
+    '''
+    lines = list()
+    for log_file_pathname in sorted(glob.glob(os.path.join(log_directory,
+                                                           '*.txt'))):
+        lines.extend(far_cry.iter_log_lines(log_file_pathname))
+    return lines
+
+
+def legacy_tokenize_frag_line(line):
+    '''
+    Description: tokenize a line of the log file into a frag the way
+                 parse_frags did before the precompiled pattern, by
+                 splitting the line on spaces and counting the tokens
+    Input:
+        line: a line of the log file
+    Output:
+        @return: a tuple (minute, second, killer_name[, victim_name,
+                 weapon_code]), or None if the line is not a frag
+    '''
+    if 'killed' in line:
+        if len(line.split(' ')) == 5:
+            minute = int(line.split(' ')[0][1:6].split(':')[0])
+            second = int(line.split(' ')[0][1:6].split(':')[1])
+            return (minute, second, line.split(' ')[2])
+        elif len(line.split(' ')) == 7:
+            minute = int(line.split(' ')[0][1:6].split(':')[0])
+            second = int(line.split(' ')[0][1:6].split(':')[1])
+            return (minute, second, line.split(' ')[2],
+                    line.split(' ')[4], line.split(' ')[6])
+    return None
+
+
+def time_tokenizer(tokenizer, lines, repeat):
+    '''
+    Description: measure how many lines per second a tokenizer processes
+    Input:
+        tokenizer: a function tokenizing one line of the log file
+        lines: the lines to tokenize
+        repeat: number of passes over the lines
+    Output:
+        @return: a tuple (lines per second, number of frags of one pass)
+    '''
+    frag_count = sum(1 for line in lines if tokenizer(line) is not None)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for line in lines:
+            tokenizer(line)
+    elapsed = time.perf_counter() - start
+    return len(lines) * repeat / elapsed, frag_count
+
+
+def benchmark_frag_tokenizers(lines, repeat):
+    '''
+    Description: compare the split-based and the pattern-based frag
+                 tokenizers on every line and on the frag lines only, and
+                 print their throughput
+    Input:
+        lines: the lines to tokenize
+        repeat: number of passes over the lines
+    Output:
+        none
+    '''
+    frag_lines = [line for line in lines if 'killed' in line]
+    for title, sample in (('all lines', lines), ('frag lines', frag_lines)):
+        legacy_speed, legacy_frags = time_tokenizer(
+            legacy_tokenize_frag_line, sample, repeat)
+        speed, frags = time_tokenizer(far_cry.tokenize_frag_line, sample,
+                                      repeat)
+        print('frag tokenizer, {} ({} lines)'.format(title, len(sample)))
+        print('  str.split : {:>12,.0f} lines/s, {} frags'.format(
+            legacy_speed, legacy_frags))
+        print('  pattern   : {:>12,.0f} lines/s, {} frags'.format(speed,
+                                                                  frags))
+        print('  speedup   : {:.2f}x'.format(speed / legacy_speed))
+
+
+def legacy_insert_match_to_sqlite(file_pathname, start_time, end_time,
+                                  game_mode, map_name, frags):
+    '''
+    Description: insert a match the way insert_match_to_sqlite did before
+                 MatchDatabase, with one execute per frag and a new
+                 connection per match
+    Input:
+        file_pathname: path name of the database file
+        start_time: start time of a match
+        end_time: end time of a match
+        game_mode: game mode of a match
+        map_name: map name of a match
+        frags: a list of frags
+    Output:
+        @return: the identifier of the match that has been inserted
+    '''
+    conn = sqlite3.connect(file_pathname)
+    cur = conn.cursor()
+    cur.execute('insert into match(start_time, end_time, game_mode, '
+                'map_name) values (?, ?, ?, ?)',
+                (start_time.isoformat(), end_time.isoformat(), game_mode,
+                 map_name))
+    conn.commit()
+    match_id = cur.lastrowid
+    for frag in frags:
+        if len(frag) == 4:
+            conn.execute('insert into match_frag values (?, ?, ?, ?, ?)',
+                         (match_id, frag[0].isoformat(), frag[1], frag[2],
+                          frag[3]))
+        elif len(frag) == 2:
+            conn.execute('insert into match_frag(match_id, frag_time, '
+                         'killer_name) values (?, ?, ?)',
+                         (match_id, frag[0].isoformat(), frag[1]))
+    conn.commit()
+    conn.close()
+    return match_id
+
+
+def copy_empty_database(database_pathname, directory, migrate=True):
+    '''
+    Description: copy a database into a directory, bring it to the schema
+                 of far_cry.MatchDatabase unless told not to, and empty
+                 every one of its tables, the aggregates, the change log
+                 and the ledger of the ingested log files included, to
+                 benchmark inserts on the same schema
+    Input:
+        database_pathname: path name of the database to copy
+        directory: directory of the copy
+        migrate: False to keep the schema of the database as it is, for
+                 the inserts written for that schema
+    Output:
+        @return: path name of the copy
+    '''
+    copy_pathname = os.path.join(directory, os.path.basename(
+        database_pathname))
+    shutil.copyfile(database_pathname, copy_pathname)
+    if migrate:
+        far_cry.MatchDatabase(copy_pathname).close()
+    connection = sqlite3.connect(copy_pathname)
+    try:
+        with connection:
+            for table_name, in connection.execute(
+                    "select name from sqlite_master where type = 'table' "
+                    "and name not like 'sqlite_%'").fetchall():
+                connection.execute('delete from "{}"'.format(table_name))
+            if connection.execute(
+                    "select 1 from sqlite_master where type = 'table' and "
+                    "name = 'sqlite_sequence'").fetchone():
+                connection.execute('delete from sqlite_sequence')
+    finally:
+        connection.close()
+    return copy_pathname
+
+
+def benchmark_sqlite_inserts(log_directory, database_pathname, repeat):
+    '''
+    Description: compare the frags per second inserted by the legacy
+                 per-row inserts, into a copy of the database with its own
+                 schema left untouched, and by MatchDatabase, into a copy
+                 brought to its schema, with its default settings and with
+                 WAL and synchronous NORMAL
+    Input:
+        log_directory: directory of the log files to insert
+        database_pathname: database whose schema is used
+        repeat: number of times every match is inserted
+    Output:
+        none
+    '''
+    matches = [match for _, log_matches, error, _ in map(
+        far_cry.parse_matches, far_cry.find_log_files([log_directory]))
+        if error is None for match in log_matches] * repeat
+    frag_count = sum(len(match.frags) for match in matches)
+
+    def legacy(pathname):
+        for match in matches:
+            legacy_insert_match_to_sqlite(pathname, match.start_time,
+                                          match.end_time, match.game_mode,
+                                          match.map_name, match.frags)
+
+    def per_match(pathname, **pragmas):
+        with far_cry.MatchDatabase(pathname, **pragmas) as database:
+            for match in matches:
+                database.insert_match(match.start_time, match.end_time,
+                                      match.game_mode, match.map_name,
+                                      match.frags)
+
+    def per_batch(pathname, **pragmas):
+        with far_cry.MatchDatabase(pathname, **pragmas) as database:
+            database.insert_matches(matches)
+
+    print('sqlite inserts of {} matches, {} frags'.format(len(matches),
+                                                          frag_count))
+    for title, insert, pragmas in (
+            ('per-row execute', legacy, {}),
+            ('executemany, match', per_match, {}),
+            ('executemany, batch', per_batch, {}),
+            ('match, WAL/NORMAL', per_match,
+             {'journal_mode': 'WAL', 'synchronous': 'NORMAL'}),
+            ('batch, WAL/NORMAL', per_batch,
+             {'journal_mode': 'WAL', 'synchronous': 'NORMAL'})):
+        with tempfile.TemporaryDirectory() as directory:
+            pathname = copy_empty_database(database_pathname, directory,
+                                           insert is not legacy)
+            start = time.perf_counter()
+            insert(pathname, **pragmas)
+            elapsed = time.perf_counter() - start
+        print('  {:<20}: {:>12,.0f} frags/s'.format(title,
+                                                    frag_count / elapsed))
+
+
+def get_parsed_log(parser):
+    '''
+    Description: get everything a parser holds about a log file, to compare
+                 two parses of the same log file
+    Input:
+        parser: a far_cry.LogParser
+    Output:
+        @return: a tuple (parser state, list of the game sessions, list of
+                 the frags)
+    '''
+    return (parser.get_state(),
+            [tuple(match[1:5]) + (list(match.frags),)
+             for match in parser.get_sessions()],
+            list(parser.frags))
+
+
+def benchmark_chunked_parser(log_directory, repeat, jobs):
+    '''
+    Description: check that parsing each log file in byte ranges gives the
+                 same result as the serial parser, whatever the number of
+                 ranges, then compare their speed on the log files put end
+                 to end
+    Input:
+        log_directory: directory of the log files
+        repeat: number of copies of the log files put end to end
+        jobs: number of processes of the chunked parser
+    Output:
+        none
+    '''
+    log_file_pathnames = sorted(glob.glob(os.path.join(log_directory,
+                                                       '*.txt')))
+    for log_file_pathname in log_file_pathnames:
+        expected = get_parsed_log(far_cry.parse_log_file(log_file_pathname))
+        for chunk_count in (2, 3, 5, 8, 13, 32, 64):
+            if get_parsed_log(far_cry.parse_log_file_in_chunks(
+                    log_file_pathname, jobs or 2, chunk_count)) != expected:
+                raise AssertionError('{} parsed in {} chunks differs from the '
+                                     'serial parse'.format(log_file_pathname,
+                                                           chunk_count))
+    print('chunked parser: {} log files, same result as the serial '
+          'parser'.format(len(log_file_pathnames)))
+    with tempfile.TemporaryDirectory() as directory:
+        pathname = os.path.join(directory, 'log.txt')
+        with open(pathname, 'wb') as log_file:
+            for _ in range(repeat):
+                for log_file_pathname in log_file_pathnames:
+                    with open(log_file_pathname, 'rb') as source:
+                        shutil.copyfileobj(source, log_file)
+        start = time.perf_counter()
+        expected = get_parsed_log(far_cry.parse_log_file(pathname))
+        serial = time.perf_counter() - start
+        start = time.perf_counter()
+        result = get_parsed_log(far_cry.parse_log_file_in_chunks(
+            pathname, jobs, chunk_count=(jobs or os.cpu_count()) * 4))
+        chunked = time.perf_counter() - start
+        if result != expected:
+            raise AssertionError('the log files put end to end parsed in '
+                                 'chunks differ from the serial parse')
+        print('  {:,} bytes, serial {:.2f}s, chunked {:.2f}s, '
+              'speedup {:.2f}x'.format(os.path.getsize(pathname), serial,
+                                       chunked, serial / chunked))
+
+
+def get_synthetic_log(directory, size):
+    '''
+    Description: get a synthetic log file of a size, generating it unless
+                 the directory already has it
+    Input:
+        directory: directory of the synthetic log files
+        size: approximate size of the log file in bytes
+    Output:
+        @return: path name of the log file
+    '''
+    log_file_pathname = os.path.join(directory,
+                                     'synthetic_{}.txt'.format(size))
+    if not os.path.isfile(log_file_pathname):
+        far_cry_generator.SyntheticLog().write(log_file_pathname + '.part',
+                                               size)
+        os.replace(log_file_pathname + '.part', log_file_pathname)
+    return log_file_pathname
+
+
+def time_stage(function, trace_memory):
+    '''
+    Description: run a stage of the pipeline and measure it
+    Input:
+        function: a function without argument running the stage
+        trace_memory: whether tracemalloc traces the memory allocations
+    Output:
+        @return: a tuple (result of the function, wall time in seconds, CPU
+                 time in seconds, peak memory allocated by the stage in
+                 bytes or None)
+    '''
+    if trace_memory:
+        tracemalloc.reset_peak()
+        memory_before = tracemalloc.get_traced_memory()[0]
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    result = function()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    peak_memory = tracemalloc.get_traced_memory()[1] - memory_before \
+        if trace_memory else None
+    return result, wall, cpu, peak_memory
+
+
+def iter_pipeline_stages(log_file_pathname, directory, database_pathname):
+    '''
+    Description: get the stages of far_cry.py run on a log file, each one
+                 getting the result of the previous ones from a shared
+                 dictionary
+    Input:
+        log_file_pathname: path name of the log file
+        directory: directory of the CSV file and of the database
+        database_pathname: database whose schema is used
+    Output:
+        @return: a generator of tuples (stage name, function without
+                 argument)
+    '''
+    context = dict()
+
+    def insert():
+        with far_cry.MatchDatabase(copy_empty_database(
+                database_pathname, directory)) as database:
+            return database.insert_matches(
+                match for match in context['parser'].get_sessions(
+                    log_file_pathname) if match.frags)
+
+    def prettify():
+        with open(os.devnull, 'w', encoding='utf-8') as null_file:
+            return far_cry.write_prettified_frags(context['parser'].frags,
+                                                  null_file)
+
+    def parse():
+        context['parser'] = far_cry.parse_log_file(log_file_pathname)
+        return context['parser']
+
+    yield 'read', lambda: len(far_cry.read_log_file(log_file_pathname))
+    yield 'start time', lambda: far_cry.read_log_start_time(
+        log_file_pathname)
+    yield 'cvars', lambda: far_cry.read_console_variables(log_file_pathname)
+    yield 'frags', parse
+    yield 'prettify', prettify
+    yield 'csv', lambda: far_cry.write_frag_csv_file(
+        os.path.join(directory, 'frags.csv'), context['parser'].frags)
+    yield 'sqlite', insert
+
+
+def read_stage_results(results_pathname):
+    '''
+    Description: read the stage timings of an earlier run, the last one of
+                 each stage and size
+    Input:
+        results_pathname: path name of a JSON lines file written by
+                          benchmark_pipeline_stages
+    Output:
+        @return: a dictionary of the records by (size, stage)
+    '''
+    with open(results_pathname, encoding='utf-8') as results_file:
+        return {(record['size'], record['stage']): record
+                for record in map(json.loads, results_file)}
+
+
+def benchmark_pipeline_stages(sizes, database_pathname, work_directory=None,
+                              trace_memory=False, results_pathname=None,
+                              baseline_pathname=None, threshold=0.1):
+    '''
+    Description: time each stage of far_cry.py (read, start time, console
+                 variables, frags, prettify, CSV, SQLite insert) on
+                 synthetic log files of growing sizes, and print their
+                 throughput, the peak memory of the process after each of
+                 them, or the peak memory of each stage when it is traced,
+                 and their slowdown from a baseline run
+    Input:
+        sizes: list of sizes of the log files, such as 1M or 1G
+        database_pathname: database whose schema is used
+        work_directory: directory keeping the synthetic log files, a
+                        temporary one if None
+        trace_memory: whether to trace the peak memory of each stage
+        results_pathname: JSON lines file the timings are appended to
+        baseline_pathname: JSON lines file of earlier timings
+        threshold: slowdown from the baseline reported as a regression
+    Output:
+        none
+    '''
+    baseline = read_stage_results(baseline_pathname) \
+        if baseline_pathname else dict()
+    with tempfile.TemporaryDirectory() as directory:
+        log_directory = work_directory or directory
+        os.makedirs(log_directory, exist_ok=True)
+        for size in map(far_cry_generator.parse_size, sizes):
+            log_file_pathname = get_synthetic_log(log_directory, size)
+            byte_count = os.path.getsize(log_file_pathname)
+            print('pipeline stages, {:,} bytes{}'.format(
+                byte_count, ', memory traced' if trace_memory else ''))
+            if trace_memory:
+                tracemalloc.start()
+            for stage, function in iter_pipeline_stages(
+                    log_file_pathname, directory, database_pathname):
+                _, wall, cpu, peak_memory = time_stage(function,
+                                                       trace_memory)
+                record = {'size': size, 'bytes': byte_count, 'stage': stage,
+                          'wall': wall, 'cpu': cpu,
+                          'peak_memory': peak_memory,
+                          'max_rss': far_cry.get_peak_memory(),
+                          'time': time.time()}
+                line = '  {:<10}: {:>8.3f}s wall {:>8.3f}s cpu {:>9.1f} ' \
+                       'MB/s'.format(stage, wall, cpu,
+                                     byte_count / wall / 1e6)
+                if peak_memory is not None:
+                    line += ' {:>9.1f} MiB peak'.format(peak_memory / 2 ** 20)
+                elif record['max_rss'] is not None:
+                    line += ' {:>9.1f} MiB max RSS'.format(
+                        record['max_rss'] / 2 ** 20)
+                if (size, stage) in baseline:
+                    ratio = wall / baseline[size, stage]['wall']
+                    line += ' {:>6.2f}x baseline{}'.format(
+                        ratio, ' REGRESSION' if ratio > 1 + threshold
+                        else '')
+                print(line)
+                if results_pathname:
+                    with open(results_pathname, 'a',
+                              encoding='utf-8') as results_file:
+                        results_file.write(json.dumps(record) + '\n')
+            if trace_memory:
+                tracemalloc.stop()
+
+
+def main():
+    argument = parse_arguments()
+    if argument.benchmark in ('all', 'tokenizer'):
+        lines = read_corpus_lines(argument.logs)
+        benchmark_frag_tokenizers(lines, argument.repeat)
+    if argument.benchmark in ('all', 'sqlite'):
+        benchmark_sqlite_inserts(argument.logs, argument.database,
+                                 argument.repeat)
+    if argument.benchmark in ('all', 'chunks'):
+        benchmark_chunked_parser(argument.logs, argument.repeat,
+                                 argument.jobs)
+    if argument.benchmark in ('all', 'stages'):
+        benchmark_pipeline_stages(argument.sizes, argument.database,
+                                  argument.work_directory,
+                                  argument.trace_memory, argument.results,
+                                  argument.baseline, argument.threshold)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+
+import argparse
+import ast
+import csv
+import datetime
+import json
+import os
+import sqlite3
+import struct
+import sys
+from array import array
+
+import far_cry
+
+try:
+    import pyarrow
+    import pyarrow.compute
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+FRAG_CSV_FIELDS = ('match_id', 'frag_time', 'killer_name', 'victim_name',
+                   'weapon_code')
+
+NPY_DESCRIPTIONS = {'b': '|i1', 'i': '<i4', 'q': '<i8'}
+
+
+def parse_arguments():
+    '''
+    Description: Parse argument from user's input.
+    Input: none
+    Output:
+        args: source of the frags (database or log files), range of
+              matches, export format and output path name
+    '''
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-d', '--database', default='far_cry.db',
+                        help='path name of the SQLite database')
+    parser.add_argument('-l', '--log', nargs='+', default=None,
+                        help='export log files, directories of log files or '
+                             'glob patterns instead of the database, their '
+                             'matches being numbered log-1, log-2...')
+    parser.add_argument('--first', type=int, default=None,
+                        help='identifier of the first match')
+    parser.add_argument('--last', type=int, default=None,
+                        help='identifier of the last match')
+    parser.add_argument('-f', '--format', default='csv',
+                        choices=['csv', 'parquet', 'npy'],
+                        help='CSV file, or one Parquet file or NumPy bundle '
+                             'per match')
+    parser.add_argument('-o', '--output', required=True,
+                        help='CSV file (- for the standard output), or '
+                             'directory of the match partitions')
+    args = parser.parse_args()
+    if args.log and (args.first is not None or args.last is not None):
+        parser.error('--first and --last only apply to the database')
+    return args
+
+
+def iter_sqlite_frag_tables(connection, first_match_id=None,
+                            last_match_id=None):
+    '''
+    Description: read the frags of a range of matches from a database, one
+                 match at a time
+    Input:
+        connection: a sqlite3 Connection object
+        first_match_id: identifier of the first match, no lower bound if
+                        None
+        last_match_id: identifier of the last match, no upper bound if None
+    Output:
+        @return: a generator of tuples (match_id, far_cry.FragTable), the
+                 frags being in the order they were inserted
+    '''
+    cursor = connection.execute(
+        'select match_id, frag_time, killer_name, victim_name, weapon_code '
+        'from match_frag where match_id between ? and ? '
+        'order by match_id, rowid',
+        (first_match_id if first_match_id is not None else -2 ** 63,
+         last_match_id if last_match_id is not None else 2 ** 63 - 1))
+    match_id = frag_table = None
+    for row in cursor:
+        if row[0] != match_id:
+            if frag_table is not None:
+                yield match_id, frag_table
+            match_id = row[0]
+            frag_table = far_cry.FragTable(
+                base_time=datetime.datetime.fromisoformat(row[1]))
+        frag_time = datetime.datetime.fromisoformat(row[1])
+        frag_table.append(
+            int((frag_time - frag_table.base_time).total_seconds()),
+            row[2], row[3], row[4])
+    if frag_table is not None:
+        yield match_id, frag_table
+
+
+def iter_log_frag_tables(log_file_pathnames):
+    '''
+    Description: parse log files, compressed or not, one match at a time.
+                 As they have no identifier outside a database, the matches
+                 are named log-1, log-2... in the order of the log files,
+                 which cannot be mistaken for the integer match_id of a
+                 database. A game session without any frag is skipped, as
+                 it is never inserted into a database.
+    Input:
+        log_file_pathnames: a list of log file path names
+    Output:
+        @return: a generator of tuples (match name, far_cry.FragTable)
+    '''
+    match_number = 0
+    for log_file_pathname in log_file_pathnames:
+        for match in far_cry.parse_log_file(log_file_pathname).get_sessions(
+                log_file_pathname):
+            if len(match.frags):
+                match_number += 1
+                yield 'log-{}'.format(match_number), match.frags
+
+
+def iter_frag_csv_rows(frag_tables):
+    '''
+    Description: turn the frags of matches into rows of the fixed schema
+                 FRAG_CSV_FIELDS, with ISO 8601 frag times and empty victim
+                 name and weapon code for a suicide
+    Input:
+        frag_tables: an iterable of tuples (match_id, far_cry.FragTable)
+    Output:
+        @return: a generator of tuples
+    '''
+    for match_id, frag_table in frag_tables:
+        for frag in frag_table:
+            if len(frag) == 4:
+                yield (match_id, frag[0].isoformat(), frag[1], frag[2],
+                       frag[3])
+            else:
+                yield match_id, frag[0].isoformat(), frag[1], '', ''
+
+
+def write_frag_csv(frag_tables, csv_file):
+    '''
+    Description: write the frags of matches as CSV with a header line
+    Input:
+        frag_tables: an iterable of tuples (match_id, far_cry.FragTable)
+        csv_file: a text file object opened with newline=''
+    Output:
+        @return: the number of frags written
+    '''
+    writer = csv.writer(csv_file)
+    writer.writerow(FRAG_CSV_FIELDS)
+    count = 0
+    for row in iter_frag_csv_rows(frag_tables):
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_npy_file(npy_file_pathname, values):
+    '''
+    Description: write an array in the NumPy .npy format, version 1.0,
+                 without requiring NumPy
+    Input:
+        npy_file_pathname: path name of the .npy file
+        values: an array of typecode 'b', 'i' or 'q'
+    Output:
+        none
+    '''
+    header = "{{'descr': '{}', 'fortran_order': False, 'shape': ({},), }}" \
+        .format(NPY_DESCRIPTIONS[values.typecode], len(values))
+    header += ' ' * (63 - (len(header) + 10) % 64) + '\n'
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    with open(npy_file_pathname, 'wb') as npy_file:
+        npy_file.write(b'\x93NUMPY\x01\x00')
+        npy_file.write(struct.pack('<H', len(header)))
+        npy_file.write(header.encode('latin1'))
+        values.tofile(npy_file)
+
+
+def read_npy_file(npy_file_pathname):
+    '''
+    Description: read an array written by write_npy_file(), without
+                 requiring NumPy
+    Input:
+        npy_file_pathname: path name of the .npy file
+    Output:
+        @return: an array
+    '''
+    with open(npy_file_pathname, 'rb') as npy_file:
+        npy_file.read(8)
+        header_length, = struct.unpack('<H', npy_file.read(2))
+        header = ast.literal_eval(npy_file.read(header_length).decode(
+            'latin1'))
+        typecode = {description: typecode for typecode, description
+                    in NPY_DESCRIPTIONS.items()}[header['descr']]
+        values = array(typecode)
+        values.frombytes(npy_file.read())
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def write_npy_partition(directory, match_id, frag_table):
+    '''
+    Description: write the frags of a match as a NumPy bundle, a directory
+                 match_<match_id> of one .npy file per column, each loadable
+                 with numpy.load():
+                     frag_time.npy: int64 POSIX timestamps in seconds
+                     killer_id.npy: int32 index in strings.json of the killer
+                     victim_id.npy: int32 index of the victim, -1 for a
+                                    suicide
+                     weapon_id.npy: int32 index of the weapon code, -1 for a
+                                    suicide
+                     strings.json: list of the names and weapon codes
+    Input:
+        directory: directory of the partitions
+        match_id: the identifier of the match, or its name if it comes
+                  from a log file
+        frag_table: a far_cry.FragTable of the frags of the match
+    Output:
+        @return: path name of the partition
+    '''
+    partition_pathname = os.path.join(directory, 'match_{}'.format(match_id))
+    os.makedirs(partition_pathname, exist_ok=True)
+    columns = frag_table.get_columns()
+    for name, column in (('frag_time', columns['timestamp']),
+                         ('killer_id', columns['killer_id']),
+                         ('victim_id', columns['victim_id']),
+                         ('weapon_id', columns['weapon_id'])):
+        write_npy_file(os.path.join(partition_pathname, name + '.npy'),
+                       column)
+    with open(os.path.join(partition_pathname, 'strings.json'), 'w',
+              encoding='utf-8') as strings_file:
+        json.dump(columns['strings'], strings_file, ensure_ascii=False)
+    return partition_pathname
+
+
+def write_parquet_partition(directory, match_id, frag_table):
+    '''
+    Description: write the frags of a match as a Parquet file
+                 match_<match_id>.parquet with the columns frag_time (UTC
+                 timestamp), killer_name, victim_name and
+                 weapon_code (dictionary-encoded strings, null for a
+                 suicide)
+    Input:
+        directory: directory of the partitions
+        match_id: the identifier of the match, or its name if it comes
+                  from a log file
+        frag_table: a far_cry.FragTable of the frags of the match
+    Output:
+        @return: path name of the partition
+    '''
+    if pyarrow is None:
+        raise ImportError('the pyarrow package is required to write Parquet '
+                          'files')
+    columns = frag_table.get_columns()
+    strings = pyarrow.array(columns['strings'], pyarrow.string())
+
+    def encode(identifiers):
+        indices = pyarrow.array(identifiers, pyarrow.int32())
+        return pyarrow.DictionaryArray.from_arrays(
+            pyarrow.compute.if_else(pyarrow.compute.less(indices, 0), None,
+                                    indices), strings)
+
+    table = pyarrow.table({
+        'frag_time': pyarrow.array(columns['timestamp'], pyarrow.int64())
+        .cast(pyarrow.timestamp('s', tz='UTC')),
+        'killer_name': encode(columns['killer_id']),
+        'victim_name': encode(columns['victim_id']),
+        'weapon_code': encode(columns['weapon_id'])
+    })
+    partition_pathname = os.path.join(directory,
+                                      'match_{}.parquet'.format(match_id))
+    pyarrow.parquet.write_table(table, partition_pathname)
+    return partition_pathname
+
+
+def write_columnar_partitions(frag_tables, directory, file_format=None):
+    '''
+    Description: write the frags of matches in a binary columnar format,
+                 one partition per match
+    Input:
+        frag_tables: an iterable of tuples (match_id, far_cry.FragTable)
+        directory: directory of the partitions, created if needed
+        file_format: 'parquet' or 'npy', Parquet if pyarrow is installed
+                     and NumPy bundles otherwise if None
+    Output:
+        @return: the list of the path names of the partitions
+    '''
+    if file_format is None:
+        file_format = 'parquet' if pyarrow is not None else 'npy'
+    write_partition = write_parquet_partition if file_format == 'parquet' \
+        else write_npy_partition
+    os.makedirs(directory, exist_ok=True)
+    return [write_partition(directory, match_id, frag_table)
+            for match_id, frag_table in frag_tables]
+
+
+def main():
+    argument = parse_arguments()
+    connection = None
+    if argument.log:
+        frag_tables = iter_log_frag_tables(far_cry.find_log_files(
+            argument.log))
+    else:
+        try:
+            connection = far_cry.connect_read_only(argument.database)
+        except OSError as error:
+            print('{}: {}'.format(type(error).__name__, error),
+                  file=sys.stderr)
+            exit(1)
+        frag_tables = iter_sqlite_frag_tables(
+            connection, argument.first, argument.last)
+    try:
+        if argument.format == 'csv':
+            if argument.output == '-':
+                count = write_frag_csv(frag_tables, sys.stdout)
+            else:
+                with open(argument.output, 'w', newline='',
+                          encoding='utf-8') as csv_file:
+                    count = write_frag_csv(frag_tables, csv_file)
+            print('{} frags exported'.format(count), file=sys.stderr)
+        else:
+            partitions = write_columnar_partitions(
+                frag_tables, argument.output, argument.format)
+            print('{} matches exported'.format(len(partitions)),
+                  file=sys.stderr)
+    except (OSError, ImportError, sqlite3.Error) as error:
+        print('{}: {}'.format(type(error).__name__, error), file=sys.stderr)
+        exit(1)
+    finally:
+        if connection is not None:
+            connection.close()
+
+
+if __name__ == '__main__':
+    main()
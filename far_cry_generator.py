@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+
+import argparse
+import datetime
+import random
+
+
+PLAYER_NAMES = ('papazark', 'lamonthe', 'theprophete', 'lythanhphu',
+                'Transporter', 'cyap', 'cynthia', 'Jack The Ripper',
+                'intek', 'Hoang', 'Sniper Wolf', 'NamNguyen')
+
+# Weapons weighted by how often they kill in the sample logs
+WEAPON_WEIGHTS = (('AG36', 264), ('Falcon', 248), ('M4', 182),
+                  ('VehicleRocket', 154), ('Rocket', 131),
+                  ('AG36Grenade', 127), ('SniperRifle', 97), ('M249', 81),
+                  ('MG', 73), ('OICW', 60), ('Machete', 54),
+                  ('OICWGrenade', 47), ('P90', 41), ('Shotgun', 18),
+                  ('MP5', 13), ('Boat', 12), ('VehicleMountedRocketMG', 9),
+                  ('HandGrenade', 6))
+
+LEVELS = (('mp_surf', 'FFA', 'Free For All'),
+          ('mp_airstrip', 'ASSAULT', 'Assault'))
+
+CONSOLE_VARIABLES = (('ca_ambient_light_intensity', '0.2000000029802322'),
+                     ('ca_ambient_light_range', '10'),
+                     ('ca_EnableDecals', '0'),
+                     ('cl_display_hud', '1'),
+                     ('g_LevelStated', '0'),
+                     ('game_GliderBackImpulse', '2.5f'),
+                     ('game_GliderDamping', '0.15f'),
+                     ('game_GliderGravity', '-0.1f'),
+                     ('gr_realistic_fp', '0'),
+                     ('sv_maxplayers', '16'),
+                     ('sv_name', "intek's Server"))
+
+SETTINGS = ('e_EntitySuppressionLevel to 2', 'ExitOnQuit to 1',
+            'i_direct_input to 1', 'sys_firstlaunch to 0',
+            'sys_script_debugger to 0')
+
+LOADING_NOISE = ('Loading Objects\\Vehicles\\buggy\\piece10.cgf',
+                 'Loading Objects\\Buildings\\M03\\Fort_ruin\\'
+                 'concreterubble01.cgf',
+                 'Loaded 205 Particle Effects from Effects\\Explosions.prt.',
+                 'ERROR: CControllerManager::LoadAnimation: file loading '
+                 'Objects\\Weapons\\M249\\.\\m249_fidget11.caf file not found',
+                 '<Lua>  BasicWeapon Init SniperRifle',
+                 '[AISYSTEM] Reading links',
+                 'WARNING: Connectivity warning: there are 1 open edges '
+                 '(3550 closed, 2367 faces, 0 planes, 0 vertices)')
+
+ERROR_NOISE = ('ERROR: there are 50 bones and 41 initial pose matrices. '
+               'ignoring matrices.',
+               'ERROR: lod 1 file merc_scout_mp.cgf has inconsistent number '
+               'of bones (41, expected 50). Please re-export the lod',
+               'Loading ...cenaries\\merc_scout\\merc_scout_mp.cgf')
+
+# A Lua error, as tuples (timestamped, line): its traceback is first logged
+# without timestamps
+SCRIPT_ERROR = ((True, 'ERROR: $3#SCRIPT ERROR File: =C, '
+                       'Function: _ERRORMESSAGE,'),
+                (False, 'error: stack overflow'),
+                (False, 'stack traceback:'),
+                (False, "   1:  `index' tag method [C]"),
+                (True, '#Function _ERRORMESSAGE '),
+                (True, '# error: stack overflow'))
+
+DEFAULT_START_TIME = datetime.datetime(2019, 4, 2, 13, 18, 53)
+
+
+def parse_arguments():
+    '''
+    Description: Parse argument from user's input.
+    Input: none
+    Output:
+        args: path name and size of the log file to generate, and the
+              shape of the games it logs
+    '''
+    parser = argparse.ArgumentParser()
+    parser.add_argument('log', help='path name of the log file to generate')
+    parser.add_argument('-s', '--size', default='1M',
+                        help='approximate size of the log file, in bytes '
+                             'or with a K, M or G suffix')
+    parser.add_argument('-p', '--players', type=int, default=8,
+                        help='number of players')
+    parser.add_argument('-r', '--rate', type=float, default=6.0,
+                        help='average number of frags per minute')
+    parser.add_argument('-m', '--minutes', type=int, default=20,
+                        help='duration of a game session, in minutes')
+    parser.add_argument('-e', '--errors', type=float, default=0.05,
+                        help='probability of error lines after a frag')
+    parser.add_argument('-c', '--cvars', type=int, default=120,
+                        help='number of console variables')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the random generator')
+    args = parser.parse_args()
+    return args
+
+
+def parse_size(size):
+    '''
+    Description: convert a size such as 512K, 10M or 1G into bytes
+    Input:
+        size: a string, a number of bytes optionally suffixed with K, M
+              or G
+    Output:
+        @return: the number of bytes
+    '''
+    size = size.strip().upper()
+    for suffix, factor in (('K', 1 << 10), ('M', 1 << 20), ('G', 1 << 30)):
+        if size.endswith(suffix):
+            return int(float(size[:-1]) * factor)
+    return int(size)
+
+
+class SyntheticLog:
+    '''
+    Description: generator of realistic Far Cry server logs: the header
+                 and console variable block of a server start, then game
+                 sessions rotating through the levels, each with its level
+                 loading noise, frags at a random pace (suicides included),
+                 error lines, script error tracebacks and statistics. The
+                 wall clock goes on from one session to the next, so the
+                 <MM:SS> stamps roll over every hour. The same seed always
+                 generates the same log.
+    '''
+    def __init__(self, player_count=8, frags_per_minute=6.0,
+                 session_minutes=20, error_rate=0.05,
+                 console_variable_count=120, suicide_rate=0.03,
+                 time_zone=-5, start_time=DEFAULT_START_TIME, seed=0):
+        '''
+        Input:
+            player_count: number of players of every session
+            frags_per_minute: average number of frags per minute
+            session_minutes: duration of a game session, in minutes
+            error_rate: probability of error lines after a frag
+            console_variable_count: number of 'Lua cvar' lines
+            suicide_rate: probability of a frag to be a suicide
+            time_zone: value of the g_timezone console variable
+            start_time: datetime.datetime of the 'Log Started at' line
+            seed: seed of the random generator
+        '''
+        self.random = random.Random(seed)
+        self.player_names = [
+            PLAYER_NAMES[i % len(PLAYER_NAMES)] +
+            (str(i // len(PLAYER_NAMES)) if i >= len(PLAYER_NAMES) else '')
+            for i in range(player_count)]
+        self.weapon_codes = [code for code, _ in WEAPON_WEIGHTS]
+        self.weapon_weights = [weight for _, weight in WEAPON_WEIGHTS]
+        self.frags_per_second = frags_per_minute / 60
+        self.session_seconds = session_minutes * 60
+        self.error_rate = error_rate
+        self.console_variable_count = console_variable_count
+        self.suicide_rate = suicide_rate
+        self.time_zone = time_zone
+        self.start_time = start_time
+        self.clock = start_time.minute * 60 + start_time.second
+        self.byte_count = 0
+        self.size = None
+        self.frag_count = 0
+        self.session_count = 0
+
+    def stamp(self, text):
+        '''
+        Description: timestamp a line with the current wall clock
+        Input:
+            text: the line, without its stamp
+        Output:
+            @return: the timestamped line
+        '''
+        seconds = self.clock % 3600
+        return '<{:02d}:{:02d}> {}'.format(seconds // 60, seconds % 60, text)
+
+    def iter_header_lines(self):
+        '''
+        Description: generate the lines logged when the server starts, up
+                     to the end of its console variable block
+        Output:
+            @return: a generator of lines
+        '''
+        yield 'Log Started at ' + self.start_time.strftime(
+            '%A, %B %d, %Y %H:%M:%S')
+        yield 'FileVersion: 1.1.3.1395'
+        yield 'ProductVersion: 1.1.3.1395'
+        yield ''
+        yield 'OS User name: \'intek\''
+        yield 'File System Initialization'
+        yield 'Script System Initialization'
+        yield self.stamp('Loading system configuration')
+        console_variables = list(CONSOLE_VARIABLES)
+        console_variables.insert(4, ('g_timezone', str(self.time_zone)))
+        console_variables.extend(
+            ('sv_synthetic_{}'.format(i), str(i))
+            for i in range(self.console_variable_count -
+                           len(console_variables)))
+        for i, (key, value) in enumerate(
+                console_variables[:self.console_variable_count]):
+            yield self.stamp('Lua cvar: ({},{})'.format(key, value))
+            if i == 2:
+                for setting in SETTINGS:
+                    yield self.stamp('Setting ' + setting)
+        yield self.stamp('Initializing Script Bindings')
+
+    def iter_session_lines(self, map_name, game_mode, mode_title):
+        '''
+        Description: generate the lines of one game session, from the
+                     loading of its level to its statistics, stopping early
+                     once the log reaches its size
+        Input:
+            map_name: name of the level
+            game_mode: mission of the level
+            mode_title: title of the mission in the 'Map:' line
+        Output:
+            @return: a generator of lines
+        '''
+        self.session_count += 1
+        yield self.stamp('Loading banned IP list...')
+        yield self.stamp('ERROR: failed to open bannedip.txt for reading!')
+        yield self.stamp(
+            '{} Loading level Levels/{}, mission {} '.format(
+                '-' * 22, map_name, game_mode).ljust(99, '-'))
+        for _ in range(20):
+            yield self.stamp(self.random.choice(LOADING_NOISE))
+        self.clock += self.random.randint(2, 6)
+        yield self.stamp(' Level {} loaded in {:.3f} seconds'.format(
+            map_name, self.random.uniform(2, 6)))
+        yield self.stamp('Precaching level ... ') + self.stamp('done')
+        players = self.player_names
+        kills = dict.fromkeys(players, 0)
+        suicides = dict.fromkeys(players, 0)
+        end_clock = self.clock + self.session_seconds
+        while self.byte_count < self.size:
+            self.clock += max(1, round(self.random.expovariate(
+                self.frags_per_second)))
+            if self.clock >= end_clock:
+                break
+            killer_name = self.random.choice(players)
+            if self.random.random() < self.suicide_rate:
+                suicides[killer_name] += 1
+                yield self.stamp('<Lua> {} killed itself'.format(killer_name))
+            else:
+                victim_name = self.random.choice(players)
+                while victim_name == killer_name and len(players) > 1:
+                    victim_name = self.random.choice(players)
+                kills[killer_name] += 1
+                yield self.stamp('<Lua> {} killed {} with {}'.format(
+                    killer_name, victim_name, self.random.choices(
+                        self.weapon_codes, self.weapon_weights)[0]))
+            self.frag_count += 1
+            if self.random.random() < self.error_rate:
+                if self.random.random() < 0.1:
+                    for timestamped, line in SCRIPT_ERROR:
+                        yield self.stamp(line) if timestamped else line
+                else:
+                    for _ in range(self.random.randint(1, 3)):
+                        yield self.stamp(self.random.choice(ERROR_NOISE))
+        separator = self.stamp('=' * 80)
+        yield separator
+        yield self.stamp('== Statistics'.ljust(78) + '==')
+        yield separator
+        yield self.stamp("Servername: intek's Server")
+        yield self.stamp('Levelname: ' + map_name)
+        yield separator
+        for player_name in players:
+            yield self.stamp('Player: ' + player_name)
+            yield self.stamp('   nKill={}'.format(kills[player_name]))
+            yield self.stamp('   nSelfKill={}'.format(suicides[player_name]))
+        yield separator
+        self.clock += self.random.randint(2, 10)
+        yield self.stamp('<Lua> Map: {} ({})'.format(map_name, mode_title))
+
+    def iter_lines(self, size):
+        '''
+        Description: generate a whole log, game session after game session,
+                     until it is about size bytes long
+        Input:
+            size: approximate size of the log in bytes
+        Output:
+            @return: a generator of lines, without their end of line
+        '''
+        self.size = size
+        lines = self.iter_header_lines()
+        level = 0
+        while True:
+            for line in lines:
+                self.byte_count += len(line) + 1
+                yield line
+            if self.byte_count >= size:
+                break
+            lines = self.iter_session_lines(*LEVELS[level % len(LEVELS)])
+            level += 1
+        self.clock += 1
+        yield self.stamp('System Shutdown')
+
+    def write(self, log_file_pathname, size):
+        '''
+        Description: write a whole log file
+        Input:
+            log_file_pathname: path name of the log file
+            size: approximate size of the log file in bytes
+        Output:
+            @return: the SyntheticLog itself
+        '''
+        with open(log_file_pathname, 'w', encoding='utf-8',
+                  newline='\n') as log_file:
+            batch = list()
+            for line in self.iter_lines(size):
+                batch.append(line)
+                if len(batch) >= 4096:
+                    log_file.write('\n'.join(batch) + '\n')
+                    batch = list()
+            log_file.write('\n'.join(batch) + '\n')
+        return self
+
+
+def main():
+    argument = parse_arguments()
+    log = SyntheticLog(argument.players, argument.rate, argument.minutes,
+                       argument.errors, argument.cvars,
+                       seed=argument.seed).write(argument.log,
+                                                 parse_size(argument.size))
+    print('{}: {} bytes, {} sessions, {} frags'.format(
+        argument.log, log.byte_count, log.session_count, log.frag_count))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+
+import argparse
+import asyncio
+import json
+import sqlite3
+from collections import namedtuple, OrderedDict
+from urllib.parse import parse_qs, urlsplit
+
+import far_cry
+
+
+NamedQuery = namedtuple('NamedQuery', ['description', 'sql', 'match_sql'])
+NamedQuery.__doc__ = '''
+    Description: a read-only query of the database of the matches, over
+                 every match (sql) or over the match whose identifier is
+                 its only parameter (match_sql, None if the query cannot
+                 be restricted to one match)
+    '''
+
+# The queries of the players read table match_statistics and the queries of
+# the weapons read the rollup table frag_cube, which are kept up to date as
+# frags are inserted, instead of aggregating table match_frag
+QUERIES = {
+    'matches': NamedQuery(
+        'start and end times, game mode and map of the matches',
+        'select match_id, start_time, end_time, game_mode, map_name '
+        'from match order by match_id',
+        'select match_id, start_time, end_time, game_mode, map_name '
+        'from match where match_id = ?'),
+    'players': NamedQuery(
+        'distinct names of the players, killers or victims',
+        'select distinct player_name from match_statistics '
+        'order by player_name',
+        'select player_name from match_statistics where match_id = ? '
+        'order by player_name'),
+    'kills': NamedQuery(
+        'number of players killed by each player, suicides excluded',
+        'select player_name, sum(kill_count) as kill_count '
+        'from match_statistics group by player_name '
+        'order by kill_count desc, player_name',
+        'select player_name, kill_count from match_statistics '
+        'where match_id = ? order by kill_count desc, player_name'),
+    'suicides': NamedQuery(
+        'number of suicides of the matches that have some',
+        'select match_id, sum(suicide_count) as suicide_count '
+        'from match_statistics group by match_id '
+        'having sum(suicide_count) > 0 '
+        'order by suicide_count, match_id',
+        'select match_id, sum(suicide_count) as suicide_count '
+        'from match_statistics where match_id = ? group by match_id '
+        'having sum(suicide_count) > 0'),
+    'efficiency': NamedQuery(
+        'kills, deaths, suicides and efficiency of the players of each '
+        'match',
+        'select match_id, player_name, kill_count, death_count, '
+        'suicide_count, efficiency from match_statistics '
+        'order by match_id, efficiency desc, player_name',
+        'select match_id, player_name, kill_count, death_count, '
+        'suicide_count, efficiency from match_statistics '
+        'where match_id = ? order by efficiency desc, player_name'),
+    'weapon_classes': NamedQuery(
+        'kills of each weapon class on each map and game mode',
+        'select map_name, game_mode, weapon_class, '
+        'sum(kill_count) as kill_count from frag_cube '
+        'group by map_name, game_mode, weapon_class '
+        'having sum(kill_count) > 0 '
+        'order by map_name, game_mode, kill_count desc, weapon_class',
+        None),
+    'hourly_kills': NamedQuery(
+        'kills of each weapon class on each map per hour (UTC)',
+        'select weapon_class, map_name, '
+        "strftime('%Y-%m-%dT%H:00:00Z', frag_hour, 'unixepoch') as hour, "
+        'sum(kill_count) as kill_count from frag_cube '
+        'group by weapon_class, map_name, frag_hour '
+        'having sum(kill_count) > 0 '
+        'order by weapon_class, map_name, frag_hour',
+        None)
+}
+
+QueryResult = namedtuple('QueryResult', ['columns', 'rows'])
+
+
+def parse_arguments():
+    '''
+    Description: Parse argument from user's input.
+    Input: none
+    Output:
+        args: database path name, query to run and match, or address of
+              the HTTP server to run, and size of the result cache
+    '''
+    parser = argparse.ArgumentParser()
+    parser.add_argument('query', nargs='?', choices=sorted(QUERIES),
+                        help='query to run, every query is listed if none')
+    parser.add_argument('-d', '--database', default='far_cry.db',
+                        help='path name of the SQLite database')
+    parser.add_argument('-m', '--match-id', type=int, default=None,
+                        help='identifier of the only match to query')
+    parser.add_argument('--serve', action='store_true',
+                        help='answer the queries over HTTP')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='address the HTTP server listens on')
+    parser.add_argument('--port', type=int, default=8080,
+                        help='port the HTTP server listens on')
+    parser.add_argument('--cache-size', type=int, default=256,
+                        help='number of query results kept in the cache')
+    args = parser.parse_args()
+    return args
+
+
+class QueryCache:
+    '''
+    Description: least recently used cache of query results, by (query
+                 name, match_id). A result over one match only depends on
+                 that match, while a result over every match (match_id
+                 None) depends on all of them.
+    '''
+    def __init__(self, capacity=256):
+        '''
+        Input:
+            capacity: maximum number of results kept
+        '''
+        self.capacity = capacity
+        self.results = OrderedDict()
+        self.hit_count = 0
+        self.miss_count = 0
+
+    def get(self, key):
+        '''
+        Description: get a result and mark it as the most recently used
+        Input:
+            key: a tuple (query name, match_id)
+        Output:
+            @return: the result, None if it is not in the cache
+        '''
+        result = self.results.get(key)
+        if result is None:
+            self.miss_count += 1
+        else:
+            self.results.move_to_end(key)
+            self.hit_count += 1
+        return result
+
+    def put(self, key, result):
+        '''
+        Description: keep a result, dropping the least recently used one if
+                     the cache is full
+        Input:
+            key: a tuple (query name, match_id)
+            result: the result of the query
+        Output:
+            none
+        '''
+        self.results[key] = result
+        self.results.move_to_end(key)
+        if len(self.results) > self.capacity:
+            self.results.popitem(last=False)
+
+    def clear(self):
+        '''
+        Description: drop every result
+        '''
+        self.results.clear()
+
+    def invalidate(self, match_ids):
+        '''
+        Description: drop the results that depend on changed matches: the
+                     results over one of these matches and every result
+                     over all the matches
+        Input:
+            match_ids: a collection of the identifiers of the matches
+        Output:
+            @return: the number of results dropped
+        '''
+        keys = [key for key in self.results
+                if key[1] is None or key[1] in match_ids]
+        for key in keys:
+            del self.results[key]
+        return len(keys)
+
+
+class QueryService:
+    '''
+    Description: read side of the database of the matches, running the
+                 named queries of QUERIES with a cache of their results.
+                 MatchDatabase logs in table match_change every match whose
+                 frags are inserted or deleted; before answering a query,
+                 the service checks whether any other connection has
+                 committed since (which costs a pragma data_version) and,
+                 if so, drops the cached results of the logged matches, or
+                 every cached result if the changes it has not read yet
+                 have been pruned from the log.
+    '''
+    def __init__(self, database_pathname, cache_size=256):
+        '''
+        Input:
+            database_pathname: path name of the database file, at schema
+                               version far_cry.SCHEMA_VERSION, opened read
+                               only; ValueError is raised if its schema is
+                               older
+            cache_size: number of query results kept in the cache
+        '''
+        self.connection = far_cry.connect_read_only(database_pathname)
+        if self.connection.execute('pragma user_version').fetchone()[0] < \
+                far_cry.SCHEMA_VERSION:
+            self.connection.close()
+            raise ValueError('{} has an older schema, ingest log files into '
+                             'it with far_cry.py to upgrade it'.format(
+                                 database_pathname))
+        self.cache = QueryCache(cache_size)
+        self.data_version = None
+        self.last_change_id = self.connection.execute(
+            'select coalesce(max(change_id), 0) from match_change'
+        ).fetchone()[0]
+
+    def refresh(self):
+        '''
+        Description: drop the cached results of the matches that changed
+                     since the last refresh
+        Output:
+            @return: the set of the identifiers of the changed matches
+        '''
+        data_version = self.connection.execute(
+            'pragma data_version').fetchone()[0]
+        if data_version == self.data_version:
+            return set()
+        self.data_version = data_version
+        changes = self.connection.execute(
+            'select change_id, match_id from match_change '
+            'where change_id > ? order by change_id',
+            (self.last_change_id,)).fetchall()
+        if not changes:
+            return set()
+        match_ids = {match_id for _, match_id in changes}
+        if changes[0][0] > self.last_change_id + 1:
+            self.cache.clear()
+        else:
+            self.cache.invalidate(match_ids)
+        self.last_change_id = changes[-1][0]
+        return match_ids
+
+    def invalidate(self, match_ids):
+        '''
+        Description: drop the cached results of matches known to have
+                     changed, such as the ones just ingested by this
+                     process
+        Input:
+            match_ids: a collection of the identifiers of the matches
+        Output:
+            none
+        '''
+        self.cache.invalidate(set(match_ids))
+
+    def query(self, name, match_id=None):
+        '''
+        Description: run a named query, or get its result from the cache
+        Input:
+            name: name of the query, a key of QUERIES
+            match_id: identifier of the only match to query, every match if
+                      None
+        Output:
+            @return: a QueryResult of the names of the columns and the list
+                     of the rows; ValueError is raised if the query cannot
+                     be restricted to one match
+        '''
+        named_query = QUERIES[name]
+        if match_id is not None and named_query.match_sql is None:
+            raise ValueError('query {} is not by match'.format(name))
+        self.refresh()
+        key = (name, match_id)
+        result = self.cache.get(key)
+        if result is None:
+            if match_id is None:
+                cursor = self.connection.execute(named_query.sql)
+            else:
+                cursor = self.connection.execute(named_query.match_sql,
+                                                 (match_id,))
+            result = QueryResult(
+                tuple(description[0] for description in cursor.description),
+                cursor.fetchall())
+            self.cache.put(key, result)
+        return result
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        '''
+        Description: close the connection to the database
+        '''
+        self.connection.close()
+
+
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+                405: 'Method Not Allowed'}
+
+
+def respond_to_http_request(service, method, target):
+    '''
+    Description: answer an HTTP request for the list of the queries
+                 (GET /queries) or for the result of a query (GET
+                 /queries/<name>, or /queries/<name>?match_id=<id> for one
+                 match)
+    Input:
+        service: a QueryService
+        method: HTTP method of the request
+        target: path and query string of the request
+    Output:
+        @return: a tuple (HTTP status code, JSON-serializable body)
+    '''
+    if method != 'GET':
+        return 405, {'error': 'only GET is supported'}
+    url = urlsplit(target)
+    path = url.path.strip('/').split('/')
+    if path == ['queries']:
+        return 200, {name: named_query.description
+                     for name, named_query in QUERIES.items()}
+    if len(path) != 2 or path[0] != 'queries' or path[1] not in QUERIES:
+        return 404, {'error': 'unknown query'}
+    match_id = parse_qs(url.query).get('match_id', [None])[0]
+    if match_id is not None:
+        try:
+            match_id = int(match_id)
+        except ValueError:
+            return 400, {'error': 'match_id is not an integer'}
+    try:
+        result = service.query(path[1], match_id)
+    except ValueError as error:
+        return 400, {'error': str(error)}
+    return 200, {'columns': result.columns, 'rows': result.rows}
+
+
+async def handle_http_connection(service, reader, writer):
+    '''
+    Description: answer the HTTP/1.1 requests of a client connection, kept
+                 alive until the client closes it or asks to
+    Input:
+        service: a QueryService
+        reader: asyncio.StreamReader of the connection
+        writer: asyncio.StreamWriter of the connection
+    Output:
+        none
+    '''
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line.strip():
+                break
+            headers = dict()
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                name, _, value = line.decode('latin1').partition(':')
+                headers[name.strip().lower()] = value.strip().lower()
+            parts = request_line.decode('latin1').split()
+            if len(parts) == 3:
+                status, body = respond_to_http_request(service, parts[0],
+                                                       parts[1])
+            else:
+                parts = [None, None, 'HTTP/1.0']
+                status, body = 400, {'error': 'malformed request'}
+            keep_alive = parts[2] == 'HTTP/1.1' and \
+                headers.get('connection') != 'close'
+            content = json.dumps(body).encode()
+            writer.write(
+                'HTTP/1.1 {} {}\r\nContent-Type: application/json\r\n'
+                'Content-Length: {}\r\nConnection: {}\r\n\r\n'.format(
+                    status, HTTP_REASONS[status], len(content),
+                    'keep-alive' if keep_alive else 'close').encode() +
+                content)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_queries(service, host='127.0.0.1', port=8080):
+    '''
+    Description: answer the queries over HTTP until cancelled. Requests
+                 are answered one at a time in the event loop, most of them
+                 from the cache.
+    Input:
+        service: a QueryService
+        host: address the server listens on
+        port: port the server listens on
+    Output:
+        none
+    '''
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_http_connection(service, reader,
+                                                      writer), host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    argument = parse_arguments()
+    try:
+        service = QueryService(argument.database, argument.cache_size)
+    except (OSError, ValueError, sqlite3.Error) as error:
+        print('{}: {}'.format(type(error).__name__, error))
+        exit(1)
+    with service:
+        if argument.serve:
+            print('Serving the queries on http://{}:{}/queries'.format(
+                argument.host, argument.port))
+            try:
+                asyncio.run(serve_queries(service, argument.host,
+                                          argument.port))
+            except KeyboardInterrupt:
+                pass
+        elif argument.query is None:
+            for name, named_query in QUERIES.items():
+                print('{:<15} {}'.format(name, named_query.description))
+        else:
+            try:
+                result = service.query(argument.query, argument.match_id)
+            except ValueError as error:
+                print(error)
+                exit(1)
+            print('\t'.join(result.columns))
+            for row in result.rows:
+                print('\t'.join(map(str, row)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+
+import argparse
+import sqlite3
+from array import array
+from collections import namedtuple
+
+import far_cry
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+PlayerMatchStatistics = namedtuple('PlayerMatchStatistics', [
+    'match_id', 'player_name', 'kill_count', 'death_count', 'suicide_count',
+    'efficiency'])
+
+PlayerStatistics = namedtuple('PlayerStatistics', [
+    'player_name', 'match_count', 'kill_count', 'death_count',
+    'suicide_count', 'efficiency'])
+
+MatchTotals = namedtuple('MatchTotals', [
+    'match_id', 'player_count', 'kill_count', 'suicide_count'])
+
+
+class FragColumns:
+    '''
+    Description: the frags of many matches as parallel integer columns:
+                 match identifier, killer identifier and victim identifier
+                 (-1 for a suicide), the player identifiers referring to a
+                 single StringDictionary
+    '''
+    def __init__(self, dictionary=None):
+        self.dictionary = dictionary if dictionary is not None \
+            else far_cry.StringDictionary()
+        self.match_ids = array('q')
+        self.killer_ids = array('i')
+        self.victim_ids = array('i')
+
+    def __len__(self):
+        return len(self.match_ids)
+
+    def add_frag_table(self, match_id, frag_table):
+        '''
+        Description: add the frags of a match
+        Input:
+            match_id: the identifier of the match
+            frag_table: a far_cry.FragTable of the frags of the match
+        Output:
+            none
+        '''
+        self.match_ids.extend([match_id] * len(frag_table))
+        if frag_table.dictionary is self.dictionary:
+            self.killer_ids.extend(frag_table.killer_ids)
+            self.victim_ids.extend(frag_table.victim_ids)
+            return
+        identifiers = [self.dictionary.get_id(string)
+                       for string in frag_table.dictionary.strings] + [-1]
+        self.killer_ids.extend([identifiers[identifier]
+                                for identifier in frag_table.killer_ids])
+        self.victim_ids.extend([identifiers[identifier]
+                                for identifier in frag_table.victim_ids])
+
+    @classmethod
+    def from_sqlite(cls, connection, first_match_id=None, last_match_id=None):
+        '''
+        Description: load the frags of a range of matches from a database
+        Input:
+            connection: a sqlite3 Connection object
+            first_match_id: identifier of the first match, no lower bound
+                            if None
+            last_match_id: identifier of the last match, no upper bound if
+                           None
+        Output:
+            @return: a FragColumns
+        '''
+        frag_columns = cls()
+        get_id = frag_columns.dictionary.get_id
+        cursor = connection.execute(
+            'select match_id, killer_name, victim_name from match_frag '
+            'where match_id between ? and ?',
+            (first_match_id if first_match_id is not None else -2 ** 63,
+             last_match_id if last_match_id is not None else 2 ** 63 - 1))
+        for match_id, killer_name, victim_name in cursor:
+            frag_columns.match_ids.append(match_id)
+            frag_columns.killer_ids.append(get_id(killer_name))
+            frag_columns.victim_ids.append(
+                -1 if victim_name is None else get_id(victim_name))
+        return frag_columns
+
+
+def calculate_match_streaks(frags, max_time_between_kills=10,
+                            min_kill_count=3):
+    '''
+    Description: compute the serial killers, serial losers and Lucky Luke
+                 killers of a match in one pass over its frags
+    Input:
+        frags: the frags of the match in time order, as returned by
+               far_cry.parse_frags
+        max_time_between_kills: maximum number of seconds between two
+                                consecutive kills of a Lucky Luke series,
+                                excluded
+        min_kill_count: minimum number of kills of a Lucky Luke series
+    Output:
+        @return: a far_cry.MatchStreaks
+    '''
+    analyzer = far_cry.StreakAnalyzer(max_time_between_kills, min_kill_count)
+    analyzer.feed(frags)
+    return analyzer.get_streaks()
+
+
+def calculate_serial_killers(frags):
+    '''
+    Description: compute the longest series of kills of each player of a
+                 match
+    Input:
+        frags: the frags of the match in time order
+    Output:
+        @return: a dictionary {player_name: [(frag_time, victim_name,
+                 weapon_code), ...]}
+    '''
+    return calculate_match_streaks(frags).serial_killers
+
+
+def calculate_serial_losers(frags):
+    '''
+    Description: compute the longest series of deaths of each player of a
+                 match
+    Input:
+        frags: the frags of the match in time order
+    Output:
+        @return: a dictionary {player_name: [(frag_time, killer_name,
+                 weapon_code), ...]}
+    '''
+    return calculate_match_streaks(frags).serial_losers
+
+
+def count_frags_by_key(keys, killer_ids, victim_ids):
+    '''
+    Description: count the kills, deaths and suicides of each (key, player)
+                 group, a key being for instance a match identifier
+    Input:
+        keys: a sequence of non-negative integer keys, one per frag
+        killer_ids: a sequence of killer identifiers, one per frag
+        victim_ids: a sequence of victim identifiers, one per frag, -1 for
+                    a suicide
+    Output:
+        @return: a list of tuples (key, player identifier, kills, deaths,
+                 suicides), one per group
+    '''
+    if numpy is not None and len(keys):
+        keys = numpy.asarray(keys, dtype=numpy.int64)
+        killer_ids = numpy.asarray(killer_ids, dtype=numpy.int64)
+        victim_ids = numpy.asarray(victim_ids, dtype=numpy.int64)
+        player_count = int(max(killer_ids.max(), victim_ids.max())) + 1
+        kills = victim_ids >= 0
+        groups = numpy.concatenate((keys * player_count + killer_ids,
+                                    keys[kills] * player_count +
+                                    victim_ids[kills]))
+        kinds = numpy.concatenate((numpy.where(kills, 0, 2),
+                                   numpy.ones(int(kills.sum()), numpy.int64)))
+        groups, inverse = numpy.unique(groups, return_inverse=True)
+        counts = numpy.bincount(inverse * 3 + kinds,
+                                minlength=len(groups) * 3).reshape(-1, 3)
+        return list(zip((groups // player_count).tolist(),
+                        (groups % player_count).tolist(),
+                        *counts.T.tolist()))
+    counts = dict()
+    for key, killer_id, victim_id in zip(keys, killer_ids, victim_ids):
+        killer_counts = counts.setdefault((key, killer_id), [0, 0, 0])
+        if victim_id >= 0:
+            killer_counts[0] += 1
+            counts.setdefault((key, victim_id), [0, 0, 0])[1] += 1
+        else:
+            killer_counts[2] += 1
+    return [group + tuple(row) for group, row in counts.items()]
+
+
+def compute_match_statistics(frag_columns):
+    '''
+    Description: compute the kills, deaths, suicides and efficiency of each
+                 player of each match
+    Input:
+        frag_columns: a FragColumns
+    Output:
+        @return: a list of PlayerMatchStatistics sorted by match identifier
+                 and decreasing efficiency
+    '''
+    strings = frag_columns.dictionary.strings
+    statistics = [
+        PlayerMatchStatistics(match_id, strings[player_id], kills, deaths,
+                              suicides, kills / (kills + deaths + suicides))
+        for match_id, player_id, kills, deaths, suicides
+        in count_frags_by_key(frag_columns.match_ids, frag_columns.killer_ids,
+                              frag_columns.victim_ids)]
+    statistics.sort(key=lambda row: (row.match_id, -row.efficiency,
+                                     row.player_name))
+    return statistics
+
+
+def compute_player_statistics(frag_columns):
+    '''
+    Description: compute the all-time kills, deaths, suicides and
+                 efficiency of each player, and the number of matches the
+                 player took part in
+    Input:
+        frag_columns: a FragColumns
+    Output:
+        @return: a list of PlayerStatistics sorted by decreasing efficiency
+    '''
+    totals = dict()
+    for row in compute_match_statistics(frag_columns):
+        total = totals.setdefault(row.player_name, [0, 0, 0, 0])
+        total[0] += 1
+        total[1] += row.kill_count
+        total[2] += row.death_count
+        total[3] += row.suicide_count
+    statistics = [
+        PlayerStatistics(player_name, matches, kills, deaths, suicides,
+                         kills / (kills + deaths + suicides))
+        for player_name, (matches, kills, deaths, suicides) in totals.items()]
+    statistics.sort(key=lambda row: (-row.efficiency, row.player_name))
+    return statistics
+
+
+def compute_match_totals(frag_columns):
+    '''
+    Description: compute the number of players, kills and suicides of each
+                 match
+    Input:
+        frag_columns: a FragColumns
+    Output:
+        @return: a list of MatchTotals sorted by match identifier
+    '''
+    totals = dict()
+    for row in compute_match_statistics(frag_columns):
+        total = totals.setdefault(row.match_id, [0, 0, 0])
+        total[0] += 1
+        total[1] += row.kill_count
+        total[2] += row.suicide_count
+    return [MatchTotals(match_id, *totals[match_id])
+            for match_id in sorted(totals)]
+
+
+def write_match_statistics(connection, statistics):
+    '''
+    Description: replace the rows of table match_statistics of the matches
+                 of some statistics, and log these matches as changed
+    Input:
+        connection: a sqlite3 Connection object on a database opened by
+                    far_cry.MatchDatabase
+        statistics: a list of PlayerMatchStatistics
+    Output:
+        none
+    '''
+    match_ids = [(match_id,) for match_id
+                 in sorted({row.match_id for row in statistics})]
+    with connection:
+        connection.executemany(
+            'delete from match_statistics where match_id = ?', match_ids)
+        connection.executemany(far_cry.INSERT_MATCH_CHANGE, match_ids)
+        connection.execute(far_cry.PRUNE_MATCH_CHANGES,
+                           (far_cry.MATCH_CHANGE_LIMIT,))
+        connection.executemany(
+            'insert into match_statistics(match_id, player_name, kill_count, '
+            'death_count, suicide_count, efficiency) '
+            'values (?, ?, ?, ?, ?, ?)', statistics)
+
+
+def parse_arguments():
+    '''
+    Description: Parse argument from user's input.
+    Input: none
+    Output:
+        args: database path name, range of matches and whether to write the
+              statistics
+    '''
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-d', '--database', default='far_cry.db',
+                        help='path name of the SQLite database')
+    parser.add_argument('--first', type=int, default=None,
+                        help='identifier of the first match')
+    parser.add_argument('--last', type=int, default=None,
+                        help='identifier of the last match')
+    parser.add_argument('-w', '--write', action='store_true',
+                        help='write the statistics into match_statistics')
+    args = parser.parse_args()
+    return args
+
+
+def main():
+    argument = parse_arguments()
+    try:
+        connection = far_cry.connect_read_only(argument.database)
+        try:
+            frag_columns = FragColumns.from_sqlite(
+                connection, argument.first, argument.last)
+        finally:
+            connection.close()
+        statistics = compute_match_statistics(frag_columns)
+        if argument.write:
+            with far_cry.MatchDatabase(argument.database) as database:
+                write_match_statistics(database.connection, statistics)
+    except (OSError, sqlite3.Error) as error:
+        print('{}: {}'.format(type(error).__name__, error))
+        exit(1)
+    for row in statistics:
+        print('{:<10} {:<20} {:>6} {:>6} {:>6} {:>7.2f}'.format(
+            row.match_id, row.player_name, row.kill_count, row.death_count,
+            row.suicide_count, row.efficiency * 100))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# Helpers shared by the tests. The test modules import this module first,
+# which puts the repository directory on the path for them to import
+# far_cry.
+import os
+import sqlite3
+import sys
+
+REPOSITORY_DIRECTORY = os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))
+sys.path.insert(0, REPOSITORY_DIRECTORY)
+
+import far_cry_benchmark  # noqa: E402
+
+LOG_DIRECTORY = os.path.join(REPOSITORY_DIRECTORY, 'logs')
+
+# The benchmark checks the chunked parser against the serial one the same
+# way
+get_parsed_log = far_cry_benchmark.get_parsed_log
+
+DUMP_QUERIES = {
+    'match': 'select start_time, end_time, game_mode, map_name from match',
+    'match_frag': 'select start_time, frag_time, killer_name, victim_name, '
+                  'weapon_code from match_frag join match using (match_id)',
+    'match_statistics': 'select start_time, player_name, kill_count, '
+                        'death_count, suicide_count, efficiency '
+                        'from match_statistics join match using (match_id)',
+    'match_console_variable': 'select start_time, key_name, value '
+                              'from match_console_variable '
+                              'join console_variable_key using (key_id) '
+                              'join match using (match_id)',
+    'killer_victim': 'select * from killer_victim where kill_count',
+    'killer_weapon': 'select * from killer_weapon where kill_count',
+    'frag_cube': 'select * from frag_cube where kill_count',
+    'match_badge': 'select match.start_time, badge, player_name, '
+                   'frag_count, match_badge.start_time, match_badge.end_time '
+                   'from match_badge join match using (match_id)',
+    'ingested_log': 'select content_hash, byte_offset, parser_state, '
+                    'match_id is not null from ingested_log'}
+
+
+def dump_database(database_pathname):
+    '''
+    Description: get the matches, frags, statistics, console variables,
+                 kill counts, badges and ledger of a database, by match
+                 start time rather than by match identifier, which depends
+                 on the order of the insertions
+    Input:
+        database_pathname: path name of the database file
+    Output:
+        @return: a dictionary of sorted lists of rows by table name
+    '''
+    connection = sqlite3.connect(database_pathname)
+    try:
+        return {table_name: sorted(map(repr, connection.execute(query)))
+                for table_name, query in DUMP_QUERIES.items()}
+    finally:
+        connection.close()
@@ -0,0 +1,57 @@
+import glob
+import os
+import shutil
+import tempfile
+import unittest
+
+from far_cry_testing import LOG_DIRECTORY, dump_database, get_parsed_log
+import far_cry
+
+LOG_FILE_PATHNAMES = sorted(glob.glob(os.path.join(LOG_DIRECTORY, '*.txt')))
+
+
+
+class ChunkedParserTest(unittest.TestCase):
+    '''
+    Description: a log file parsed in byte ranges by a pool of processes
+                 gives the same result as the serial parser
+    '''
+    def test_same_parse_whatever_the_chunk_count(self):
+        for log_file_pathname in LOG_FILE_PATHNAMES:
+            expected = get_parsed_log(far_cry.parse_log_file(
+                log_file_pathname))
+            for chunk_count in (2, 3, 7):
+                with self.subTest(log_file=os.path.basename(
+                        log_file_pathname), chunk_count=chunk_count):
+                    self.assertEqual(get_parsed_log(
+                        far_cry.parse_log_file_in_chunks(
+                            log_file_pathname, 2, chunk_count)), expected)
+
+    def test_same_ingestion_in_chunks(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        log_file_pathname = os.path.join(directory, 'log.txt')
+        with open(log_file_pathname, 'wb') as log_file:
+            for pathname in LOG_FILE_PATHNAMES:
+                with open(pathname, 'rb') as part:
+                    log_file.write(part.read())
+        chunk_min_size = far_cry.PARALLEL_CHUNK_MIN_SIZE
+        far_cry.PARALLEL_CHUNK_MIN_SIZE = 64 << 10
+        self.addCleanup(setattr, far_cry, 'PARALLEL_CHUNK_MIN_SIZE',
+                        chunk_min_size)
+        self.assertTrue(far_cry.should_parse_in_chunks(log_file_pathname, 0,
+                                                       2))
+        dumps = list()
+        for jobs in (1, 2):
+            database_pathname = os.path.join(directory,
+                                             '{}.db'.format(jobs))
+            with far_cry.MatchDatabase(database_pathname) as database:
+                _, _, errors = far_cry.ingest_log_files(
+                    [log_file_pathname], database, jobs)
+            self.assertEqual(errors, {})
+            dumps.append(dump_database(database_pathname))
+        self.assertEqual(dumps[0], dumps[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
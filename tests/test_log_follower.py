@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from far_cry_testing import LOG_DIRECTORY, dump_database
+import far_cry
+
+# log05.txt rotates through five levels, two of them left without any frag
+LOG_FILE_PATHNAME = os.path.join(LOG_DIRECTORY, 'log05.txt')
+
+LATE_FRAG_LINE = b'<24:20> <Lua> lythanhphu killed papazark with Falcon\n'
+
+class LogFollowerTest(unittest.TestCase):
+    '''
+    Description: following a log file while it is written gives the rows
+                 of the batch ingestion of the whole log file
+    '''
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.log_file_pathname = os.path.join(self.directory, 'log.txt')
+        with open(LOG_FILE_PATHNAME, 'rb') as log_file:
+            content = log_file.read()
+        statistics_end = content.index(b'\n', content.index(
+            b'== Statistics')) + 1
+        self.content = content[:statistics_end] + LATE_FRAG_LINE + \
+            content[statistics_end:]
+        self.expected = self.ingest('batch.db', self.content)
+
+    def write_log_file(self, content):
+        with open(self.log_file_pathname, 'wb') as log_file:
+            log_file.write(content)
+
+    def ingest(self, database_name, content):
+        self.write_log_file(content)
+        database_pathname = os.path.join(self.directory, database_name)
+        with far_cry.MatchDatabase(database_pathname) as database:
+            _, _, errors = far_cry.ingest_log_files(
+                [self.log_file_pathname], database, jobs=1)
+        self.assertEqual(errors, {})
+        return dump_database(database_pathname)
+
+    def follow(self, database_name, content):
+        self.write_log_file(content)
+        database_pathname = os.path.join(self.directory, database_name)
+        with far_cry.MatchDatabase(database_pathname) as database:
+            far_cry.LogFollower(self.log_file_pathname, database,
+                                batch_size=3).run(idle_timeout=0)
+        return dump_database(database_pathname)
+
+    def test_batch_ingestion_skips_matches_without_frags(self):
+        self.assertEqual(len(self.expected['match']), 3)
+        self.assertEqual(len(self.expected['match_frag']),
+                         self.content.count(b' killed '))
+
+    def test_same_rows_as_batch_ingestion(self):
+        self.assertEqual(self.follow('follow.db', self.content),
+                         self.expected)
+
+    def test_same_rows_when_followed_again(self):
+        middle = self.content.index(b'\n', len(self.content) // 2) + 1
+        self.follow('follow.db', self.content[:middle] + b'<24:')
+        self.assertEqual(self.follow('follow.db', self.content),
+                         self.expected)
+
+    def test_frags_written_within_max_latency_while_lines_arrive(self):
+        # log00.txt is a single match, so no session end writes a batch,
+        # and it is whole before it is followed, so every line read is
+        # complete until the end of the log file
+        with open(os.path.join(LOG_DIRECTORY, 'log00.txt'), 'rb') as log_file:
+            content = log_file.read()
+        expected = self.ingest('batch00.db', content)
+        database_pathname = os.path.join(self.directory, 'latency.db')
+        with far_cry.MatchDatabase(database_pathname) as database:
+            follower = far_cry.LogFollower(self.log_file_pathname, database,
+                                           batch_size=10 ** 6,
+                                           max_latency=0.05)
+            # The frags are parsed slower than they may wait
+            follower.parser.frag_listeners.append(
+                lambda *frag: time.sleep(0.005))
+            waits = list()
+            record_log_ingestion = database.record_log_ingestion
+
+            def record(ingestion, ledger):
+                if follower.byte_offset < len(content):
+                    waits.append(time.monotonic() - follower.pending_since)
+                record_log_ingestion(ingestion, ledger)
+
+            database.record_log_ingestion = record
+            follower.run(idle_timeout=0)
+        self.assertGreater(len(waits), 1)
+        self.assertLess(max(waits), 0.1)
+        self.assertEqual(dump_database(database_pathname), expected)
+
+if __name__ == '__main__':
+    unittest.main()
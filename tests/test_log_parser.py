@@ -0,0 +1,145 @@
+import glob
+import os
+import shutil
+import tempfile
+import unittest
+
+from far_cry_testing import LOG_DIRECTORY, get_parsed_log
+import far_cry
+
+LOG_FILE_PATHNAME = os.path.join(LOG_DIRECTORY, 'log05.txt')
+
+
+class FeedLogBufferTest(unittest.TestCase):
+    '''
+    Description: a log file scanned by runs of stamps gives the parse of
+                 the same log file fed line by line
+    '''
+    def setUp(self):
+        dense_frag_line_ratio = far_cry.DENSE_FRAG_LINE_RATIO
+        self.addCleanup(setattr, far_cry, 'DENSE_FRAG_LINE_RATIO',
+                        dense_frag_line_ratio)
+
+    def parse(self, log_file_pathname, dense_frag_line_ratio):
+        far_cry.DENSE_FRAG_LINE_RATIO = dense_frag_line_ratio
+        return far_cry.parse_log_file(log_file_pathname)
+
+    def test_same_parse_by_stamp_runs(self):
+        for log_file_pathname in sorted(glob.glob(os.path.join(
+                LOG_DIRECTORY, '*.txt'))):
+            with self.subTest(log_file=os.path.basename(log_file_pathname)):
+                by_lines = self.parse(log_file_pathname, 0)
+                by_stamp_runs = self.parse(log_file_pathname, 2)
+                self.assertEqual(by_lines.stamp_run_count, 0)
+                self.assertGreater(by_stamp_runs.stamp_run_count, 0)
+                self.assertEqual(get_parsed_log(by_stamp_runs),
+                                 get_parsed_log(by_lines))
+
+    def test_sparse_log_scanned_by_stamp_runs(self):
+        # log01.txt is mostly the loading of a level, with few frags
+        log_file_pathname = os.path.join(LOG_DIRECTORY, 'log01.txt')
+        parser = far_cry.parse_log_file(log_file_pathname)
+        self.assertGreater(parser.stamp_run_count, 0)
+        self.assertEqual(get_parsed_log(parser), get_parsed_log(
+            self.parse(log_file_pathname, 0)))
+
+
+class ConsoleVariableTest(unittest.TestCase):
+    '''
+    Description: only the lines setting a console variable are taken for
+                 console variables, whatever the names of the players
+    '''
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.log_file_pathname = os.path.join(self.directory, 'log.txt')
+        with open(LOG_FILE_PATHNAME, 'rb') as log_file:
+            content = log_file.read()
+        # The player is killed in frag lines and shows up in 'Player: '
+        # lines of the statistics of the matches
+        self.assertIn(b'Player: papazark', content)
+        with open(self.log_file_pathname, 'wb') as log_file:
+            log_file.write(content.replace(b'papazark', b'cvarmoomoo'))
+        self.expected = far_cry.parse_log_file(LOG_FILE_PATHNAME)
+
+    def test_player_name_containing_cvar(self):
+        for parser in (far_cry.parse_log_file(self.log_file_pathname),
+                       far_cry.parse_log_file_in_chunks(
+                           self.log_file_pathname, 2, 3)):
+            self.assertEqual(parser.console_variables,
+                             self.expected.console_variables)
+            self.assertEqual(parser.time_zone, self.expected.time_zone)
+            self.assertEqual(
+                [match.console_variables for match in parser.get_sessions()],
+                [match.console_variables
+                 for match in self.expected.get_sessions()])
+            self.assertIn('cvarmoomoo', [frag[2] for frag in parser.frags
+                                         if len(frag) == 4])
+
+    def test_ingest_player_name_containing_cvar(self):
+        with far_cry.MatchDatabase(os.path.join(self.directory,
+                                                'far_cry.db')) as database:
+            match_ids, _, errors = far_cry.ingest_log_files(
+                [self.log_file_pathname], database, jobs=1)
+            self.assertEqual(errors, {})
+            self.assertEqual(len(match_ids[self.log_file_pathname]), 3)
+            for match_id in match_ids[self.log_file_pathname]:
+                self.assertEqual(database.get_console_variables(match_id),
+                                 self.expected.console_variables)
+
+
+class UnterminatedLogTest(unittest.TestCase):
+    '''
+    Description: the last line of a finished log file is ingested even
+                 without an end of line, and the whole log file is recorded
+                 in the ledger
+    '''
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.log_file_pathname = os.path.join(self.directory, 'log.txt')
+        with open(LOG_FILE_PATHNAME, 'rb') as log_file:
+            self.content = log_file.read() + \
+                b'<29:59> <Lua> lythanhphu killed papazark with Falcon'
+        with open(self.log_file_pathname, 'wb') as log_file:
+            log_file.write(self.content)
+
+    def check_ingested(self, database):
+        self.assertEqual(database.connection.execute(
+            'select count(*) from match_frag').fetchone()[0],
+            self.content.count(b' killed '))
+        entry = database.load_ledger()[self.log_file_pathname]
+        self.assertEqual(entry.byte_offset, len(self.content))
+        _, unchanged, errors = far_cry.ingest_log_files(
+            [self.log_file_pathname], database, jobs=1)
+        self.assertEqual((unchanged, errors), ([self.log_file_pathname], {}))
+
+    def test_last_line_ingested(self):
+        chunk_min_size = far_cry.PARALLEL_CHUNK_MIN_SIZE
+        far_cry.PARALLEL_CHUNK_MIN_SIZE = 16 << 10
+        self.addCleanup(setattr, far_cry, 'PARALLEL_CHUNK_MIN_SIZE',
+                        chunk_min_size)
+        self.assertTrue(far_cry.should_parse_in_chunks(
+            self.log_file_pathname, 0, 2))
+        for jobs in (1, 2):
+            with self.subTest(jobs=jobs), far_cry.MatchDatabase(
+                    os.path.join(self.directory,
+                                 '{}.db'.format(jobs))) as database:
+                _, _, errors = far_cry.ingest_log_files(
+                    [self.log_file_pathname], database, jobs)
+                self.assertEqual(errors, {})
+                self.check_ingested(database)
+
+    def test_last_line_of_a_single_log_file_ingested(self):
+        with far_cry.MatchDatabase(os.path.join(self.directory,
+                                                'far_cry.db')) as database:
+            parser, ingestion = far_cry.parse_whole_log_job(
+                far_cry.plan_log_ingestion(self.log_file_pathname, None))
+            self.assertEqual(list(parser.frags)[-1][1:],
+                             ('lythanhphu', 'papazark', 'Falcon'))
+            database.record_log_ingestion(ingestion, database.load_ledger())
+            self.check_ingested(database)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,203 @@
+import datetime
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from far_cry_testing import LOG_DIRECTORY
+import far_cry
+
+LOG_FILE_PATHNAME = os.path.join(LOG_DIRECTORY, 'log05.txt')
+
+START_TIME = datetime.datetime(2019, 3, 4, 22, 7, 21,
+                               tzinfo=datetime.timezone(
+                                   datetime.timedelta(hours=7)))
+
+
+class FakeCursor:
+    '''
+    Description: a cursor of the fake PostgreSQL connection, giving the
+                 identifiers 'match-1', 'match-2'... to the matches
+                 inserted and keeping what COPY reads
+    '''
+    def __init__(self, connection):
+        self.connection = connection
+        self.row = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def execute(self, statement, parameters=None):
+        self.connection.statements.append((statement, parameters))
+        if statement.startswith('insert into match('):
+            self.connection.match_count += 1
+            self.row = ('match-{}'.format(self.connection.match_count),)
+
+    def fetchone(self):
+        return self.row
+
+    def copy_expert(self, statement, stream, size):
+        reads = list()
+        while True:
+            data = stream.read(size)
+            if not data:
+                break
+            self.connection.read_sizes.append(len(data))
+            reads.append(data)
+        self.connection.copies.append((statement, ''.join(reads)))
+
+
+class FakeConnection:
+    '''
+    Description: a fake psycopg2 connection, recording the statements
+                 executed, the data copied and the transactions committed
+                 or rolled back
+    '''
+    def __init__(self):
+        self.statements = list()
+        self.copies = list()
+        self.read_sizes = list()
+        self.match_count = 0
+        self.commit_count = 0
+        self.rollback_count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit_count += 1
+        else:
+            self.rollback_count += 1
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+class FakePool:
+    '''
+    Description: a pool of a single fake connection, with the methods of
+                 psycopg2.pool used by PostgreSQLMatchDatabase
+    '''
+    def __init__(self):
+        self.connection = FakeConnection()
+        self.taken = 0
+        self.closed = False
+
+    def getconn(self):
+        self.taken += 1
+        return self.connection
+
+    def putconn(self, connection):
+        self.taken -= 1
+
+    def closeall(self):
+        self.closed = True
+
+
+class PostgreSQLMatchDatabaseTest(unittest.TestCase):
+    '''
+    Description: the PostgreSQL backend inserts each match with INSERT ...
+                 RETURNING and streams the frags of all the matches with one
+                 COPY, as checked against a fake pool of connections
+    '''
+    def setUp(self):
+        self.pool = FakePool()
+        self.database = far_cry.PostgreSQLMatchDatabase(pool=self.pool)
+        self.connection = self.pool.connection
+        self.connection.statements = list()
+
+    def test_copy_payload_escapes(self):
+        frag_time = START_TIME + datetime.timedelta(seconds=5)
+        frags = [(frag_time, 'tab\tname', 'new\nline', 'back\\slash'),
+                 (frag_time, 'carriage\rreturn'),
+                 (frag_time, 'tab\tname', 'plain', 'AG36')]
+        self.database.COPY_BUFFER_SIZE = 16
+        match_id = self.database.insert_match(
+            START_TIME, START_TIME + datetime.timedelta(minutes=20), 'FFA',
+            'mp_surf', frags)
+        self.assertEqual(match_id, 'match-1')
+        self.assertEqual(self.connection.copies, [(
+            far_cry.PostgreSQLMatchDatabase.COPY_FRAGS,
+            'match-1\t2019-03-04T22:07:26+07:00\ttab\\tname\tnew\\nline\t'
+            'back\\\\slash\n'
+            'match-1\t2019-03-04T22:07:26+07:00\tcarriage\\rreturn\t\\N\t'
+            '\\N\n'
+            'match-1\t2019-03-04T22:07:26+07:00\ttab\\tname\tplain\tAG36\n')])
+        self.assertTrue(all(size <= 16
+                            for size in self.connection.read_sizes))
+        self.assertEqual(self.connection.commit_count, 2)
+        self.assertEqual(self.pool.taken, 0)
+
+    def test_match_ids_returned_by_insert(self):
+        matches = far_cry.parse_log_file(LOG_FILE_PATHNAME).get_sessions()
+        match_ids = self.database.insert_matches(matches)
+        self.assertEqual(match_ids, ['match-{}'.format(index + 1)
+                                     for index in range(len(matches))])
+        self.assertEqual(self.connection.statements, [
+            (far_cry.PostgreSQLMatchDatabase.INSERT_MATCH,
+             (match.start_time, match.end_time, match.game_mode,
+              match.map_name)) for match in matches])
+        _, payload = self.connection.copies[0]
+        self.assertEqual(
+            [line.split('\t', 1)[0] for line in payload.splitlines()],
+            [match_id for match_id, match in zip(match_ids, matches)
+             for _ in match.frags])
+        self.database.close()
+        self.assertTrue(self.pool.closed)
+
+    def test_rolled_back_on_error(self):
+        with self.assertRaises(AttributeError):
+            self.database.insert_match(START_TIME, START_TIME, 'FFA',
+                                       'mp_surf', [(None, 'killer')])
+        self.assertEqual(self.connection.rollback_count, 1)
+        self.assertEqual(self.pool.taken, 0)
+
+
+class MemoryMatchDatabaseTest(unittest.TestCase):
+    '''
+    Description: memory:// keeps the matches and frags SQLite stores
+    '''
+    def test_same_frags_as_sqlite(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        database_pathname = os.path.join(directory, 'far_cry.db')
+        matches = far_cry.parse_log_file(LOG_FILE_PATHNAME).get_sessions()
+        with far_cry.open_match_database('memory://') as database:
+            self.assertIsInstance(database, far_cry.MemoryMatchDatabase)
+            memory_match_ids = database.insert_matches(matches)
+            memory_matches = [
+                (database.matches[match_id][:4],
+                 [(frag[0].isoformat(),) + tuple(frag[1:]) +
+                  (None, None)[:4 - len(frag)]
+                  for frag in database.frags[match_id]])
+                for match_id in memory_match_ids]
+        with far_cry.open_match_database(database_pathname) as database:
+            self.assertIsInstance(database, far_cry.MatchDatabase)
+            sqlite_match_ids = database.insert_matches(matches)
+        connection = sqlite3.connect(database_pathname)
+        self.addCleanup(connection.close)
+        sqlite_matches = [
+            (tuple(connection.execute(
+                'select start_time, end_time, game_mode, map_name '
+                'from match where match_id = ?', (match_id,)).fetchone()),
+             connection.execute(
+                'select frag_time, killer_name, victim_name, weapon_code '
+                'from match_frag where match_id = ? order by rowid',
+                (match_id,)).fetchall())
+            for match_id in sqlite_match_ids]
+        self.assertEqual(
+            [((start_time.isoformat(), end_time.isoformat(), game_mode,
+               map_name), frags)
+             for (start_time, end_time, game_mode, map_name), frags
+             in memory_matches], sqlite_matches)
+        self.assertEqual(sum(len(frags) for _, frags in sqlite_matches),
+                         sum(len(match.frags) for match in matches))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from far_cry_testing import LOG_DIRECTORY
+import far_cry
+
+# log05.txt rotates through five levels, two of them left without any frag
+LOG_FILE_PATHNAME = os.path.join(LOG_DIRECTORY, 'log05.txt')
+
+
+def get_series_lengths(streaks):
+    '''
+    Description: get the length of every series of a MatchStreaks, the
+                 times of the frags being offsets or datetime.datetime
+                 objects depending on where they come from
+    Input:
+        streaks: a far_cry.MatchStreaks
+    Output:
+        @return: a list of dictionaries {player_name: length}, one per
+                 field of MatchStreaks
+    '''
+    return [{player_name: len(series)
+             for player_name, series in players.items()}
+            for players in streaks]
+
+
+class StreakAnalyzerTest(unittest.TestCase):
+    '''
+    Description: the series of a match are found in the pass of the parser
+                 and stored with the match when it is ingested
+    '''
+    def test_lucky_luke_kills_less_than_max_time_apart(self):
+        analyzer = far_cry.StreakAnalyzer(max_time_between_kills=10,
+                                          min_kill_count=3)
+        analyzer.feed([(0, 'a', 'b', 'AG36'), (10, 'a', 'c', 'AG36'),
+                       (20, 'a', 'd', 'AG36'), (100, 'b', 'a', 'AG36'),
+                       (109, 'b', 'c', 'AG36'), (118, 'b', 'd', 'AG36')])
+        self.assertEqual(get_series_lengths(analyzer.get_streaks())[2],
+                         {'b': 3})
+
+    def test_series_start_over_with_each_session(self):
+        parser = far_cry.LogParser()
+        analyzer = far_cry.StreakAnalyzer()
+        parser.frag_listeners.append(analyzer.add_frag)
+        parser.session_listeners.append(analyzer.end_session)
+        parser.feed_lines(far_cry.iter_log_lines(LOG_FILE_PATHNAME))
+        session_streaks = analyzer.session_streaks + [analyzer.get_streaks()]
+        matches = parser.get_sessions()
+        self.assertEqual(len(session_streaks), len(matches))
+        for streaks, match in zip(session_streaks, matches):
+            expected = far_cry.StreakAnalyzer()
+            expected.feed(match.frags)
+            self.assertEqual(get_series_lengths(streaks),
+                             get_series_lengths(expected.get_streaks()))
+
+    def test_badges_stored_per_match(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        matches = far_cry.parse_log_file(LOG_FILE_PATHNAME).get_sessions()
+        with far_cry.MatchDatabase(os.path.join(directory,
+                                                'far_cry.db')) as database:
+            far_cry.ingest_log_files([LOG_FILE_PATHNAME], database, jobs=1)
+            for match_id, start_time in database.connection.execute(
+                    'select match_id, start_time from match').fetchall():
+                match, = [match for match in matches
+                          if match.start_time.isoformat() == start_time]
+                expected = far_cry.StreakAnalyzer()
+                expected.feed(match.frags)
+                self.assertEqual(
+                    {badge: {player_name: frag_count
+                             for player_name, frag_count, _, _ in rows}
+                     for badge, rows in database.get_match_badges(
+                         match_id).items()},
+                    {badge: lengths for badge, lengths in zip(
+                        far_cry.MATCH_BADGES,
+                        get_series_lengths(expected.get_streaks()))
+                     if lengths})
+
+
+if __name__ == '__main__':
+    unittest.main()